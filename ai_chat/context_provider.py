@@ -4,8 +4,11 @@ Builds rich English context strings from game and engine state for the AI chat s
 Two modes:
 - build_trash_talk_context : focused on the opponent's last move quality (brief, punchy).
   Result is used as the "user" message in the move-comment generation prompt.
-- build_coaching_context   : comprehensive game + position state for answering player questions.
-  Result is injected into the system prompt so the LLM has all information it needs.
+- build_coaching_context   : comprehensive position state for answering player questions.
+  Result is prepended to the player's latest message so the LLM has all information it needs.
+  The per-game part (who is playing, the coaching role) comes from build_coaching_instructions
+  and is used as the system prompt, which stays identical for the whole game so the server
+  can reuse its cached prompt.
 
 Neither function knows anything about chess tactics — it just translates engine numbers
 and board state into plain English so the LLM can reason about them.
@@ -31,6 +34,9 @@ _PIECE_NAMES = {
     chess.KING: "king",
 }
 
+# Number of half-moves described in the coaching context's move history
+RECENT_MOVE_PLIES = 6
+
 # Rough material values in pawns (king excluded from balance)
 _PIECE_VALUES = {
     chess.PAWN: 1,
@@ -158,7 +164,7 @@ def _best_continuation(engine: EngineWrapper) -> Optional[str]:
     return " ".join(tokens) if tokens else None
 
 
-def _recent_move_history(board: chess.Board, last_n: int = 6) -> str:
+def _recent_move_history(board: chess.Board, last_n: int = RECENT_MOVE_PLIES) -> str:
     """
     Describe the last *last_n* half-moves in plain English.
     Returns an empty string when no moves have been played.
@@ -293,6 +299,36 @@ def build_trash_talk_context(
     )
 
 
+def build_coaching_instructions(game: model.Game) -> str:
+    """
+    Build the system prompt used when the bot is answering a coaching question from the player.
+
+    Only contains information that is fixed for the whole game, so the prompt is byte-identical
+    on every turn. The position itself is supplied by build_coaching_context.
+    """
+    # Rating info (may be None for AI opponents)
+    bot_rating = f" (rated {game.me.rating})" if game.me.rating else ""
+    player_rating = f" (rated {game.opponent.rating})" if game.opponent.rating else ""
+
+    return (
+        "=== CHESS GAME ===\n"
+        f"You are coaching the human player '{game.opponent.name}'{player_rating} "
+        f"who is playing as {game.opponent_color}.\n"
+        f"Their opponent is the chess bot '{game.me.name}'{bot_rating} playing as {game.my_color}.\n"
+        f"Game type: {game.perf_name}, {game.mode}.\n"
+        "IMPORTANT: In the game context, 'you' and 'your' always refer to the human player "
+        f"('{game.opponent.name}', playing as {game.opponent_color}), never to the bot.\n"
+        "\n"
+        "=== YOUR ROLE AS A COACH ===\n"
+        f"You are a gentle, encouraging chess coach helping '{game.opponent.name}' (the human player, {game.opponent_color}). "
+        "Their latest message starts with the current game context. Use ONLY that context "
+        "to answer their question. Explain in plain English — if you mention "
+        "a chess term, immediately clarify what it means. Never be condescending. Be concise but thorough. "
+        "Do NOT trash-talk. When referring to moves or pieces, always clarify which side they belong to. "
+        "Keep your answer to 2-3 sentences."
+    )
+
+
 def build_coaching_context(
         game: model.Game,
         engine: EngineWrapper,
@@ -300,8 +336,8 @@ def build_coaching_context(
         player_last_move_desc: Optional[str] = None,
 ) -> str:
     """
-    Build a comprehensive game-state context block injected into the system prompt
-    when the bot is answering a coaching question from the player.
+    Build a comprehensive position-state context block that is prepended to the player's
+    message when the bot is answering a coaching question.
 
     All perspective markers ("you", "your") refer to the HUMAN PLAYER (the opponent of the bot),
     not the bot itself. The LLM is acting as a coach for the human, not as the bot.
@@ -345,10 +381,6 @@ def build_coaching_context(
     )
     last_move_str = last_move_quality if last_move_quality else "Move quality data not available."
 
-    # Rating info (may be None for AI opponents)
-    bot_rating = f" (rated {game.me.rating})" if game.me.rating else ""
-    player_rating = f" (rated {game.opponent.rating})" if game.opponent.rating else ""
-
     # Explicitly label the last two half-moves so the LLM cannot confuse them
     if player_last_move_desc:
         last_moves_block = (
@@ -368,14 +400,6 @@ def build_coaching_context(
         )
 
     return (
-        "=== CHESS GAME CONTEXT ===\n"
-        f"You are coaching the human player '{game.opponent.name}'{player_rating} "
-        f"who is playing as {game.opponent_color}.\n"
-        f"Their opponent is the chess bot '{game.me.name}'{bot_rating} playing as {game.my_color}.\n"
-        f"Game type: {game.perf_name}, {game.mode}.\n"
-        "IMPORTANT: In this entire context, 'you' and 'your' always refer to the human player "
-        f"('{game.opponent.name}', playing as {game.opponent_color}), never to the bot.\n"
-        "\n"
         "=== CURRENT POSITION ===\n"
         f"Game phase: {phase} (approximately move {move_num}).\n"
         f"It is {turn_label}'s turn to move next.\n"
@@ -396,12 +420,5 @@ def build_coaching_context(
         f"{threats_str}\n"
         "\n"
         "=== RECENT MOVE HISTORY (most recent entry = bot's last move) ===\n"
-        f"{recent_history}\n"
-        "\n"
-        "=== YOUR ROLE AS A COACH ===\n"
-        f"You are a gentle, encouraging chess coach helping '{game.opponent.name}' (the human player, {game.opponent_color}). "
-        "Use ONLY the information above to answer their question. Explain in plain English — if you mention "
-        "a chess term, immediately clarify what it means. Never be condescending. Be concise but thorough. "
-        "Do NOT trash-talk. When referring to moves or pieces, always clarify which side they belong to. "
-        "Keep your answer to 2-3 sentences."
+        f"{recent_history}"
     )
@@ -1,13 +1,17 @@
 import logging
+import queue
 import re
 import threading
-from typing import Callable, Optional
+import zlib
+from typing import Any, Callable, Optional
 
 import chess
 
 from lib import model
 from lib.engine_wrapper import EngineWrapper
-from .context_provider import build_coaching_context, build_trash_talk_context, game_phase
+from .context_provider import (
+    RECENT_MOVE_PLIES, build_coaching_context, build_coaching_instructions, build_trash_talk_context
+)
 from .history import ChatHistory
 from .move_describer import describe_move
 from .server_client import LlamaCppClient
@@ -16,6 +20,14 @@ from .settings import LlamaCppChatSettings
 logger = logging.getLogger(__name__)
 
 _LICHESS_CHAT_LIMIT = 140
+# A 140-character chat message is roughly 35-45 tokens; anything generated past that is cut anyway
+_MAX_COMMENT_TOKENS = 50
+# Move comments are a single chat line, so stop at a paragraph break and discourage repetition
+_COMMENT_STOP = ["\n\n", "</s>"]
+_COMMENT_FREQUENCY_PENALTY = 0.3
+_MAX_QUEUED_JOBS = 4
+
+_Job = tuple[Callable[..., None], tuple[Any, ...]]
 
 
 def _split_for_chat(text: str, limit: int = _LICHESS_CHAT_LIMIT) -> list[str]:
@@ -43,6 +55,26 @@ def _split_for_chat(text: str, limit: int = _LICHESS_CHAT_LIMIT) -> list[str]:
     return chunks if chunks else [text[:limit]]
 
 
+def _take_complete_chunks(buffer: str) -> tuple[list[str], str]:
+    """
+    Split off the chunks of a partially streamed reply that later text can no longer change.
+
+    Returns those chunks and the rest of ``buffer``. The rest is kept verbatim, so whitespace at the
+    end of one streamed piece is still there when the next piece is appended.
+    """
+    chunks = _split_for_chat(buffer)
+    complete = chunks[:-1]
+    pos = 0
+    for chunk in complete:
+        # _split_for_chat may collapse whitespace between sentences, so match any whitespace run
+        pattern = r"\s*" + r"\s+".join(re.escape(word) for word in chunk.split())
+        match = re.compile(pattern).match(buffer, pos)
+        if match is None:
+            return complete, chunks[-1]
+        pos = match.end()
+    return complete, buffer[pos:]
+
+
 class AIChatHandler:
     """
     Coordinates AI chat during a Lichess game.
@@ -50,17 +82,22 @@ class AIChatHandler:
     Two entry points:
     - ``get_ai_response``: reply to a message typed by the opponent.
     - ``after_move``: optionally comment after a notable move (blunder or strong move).
+
+    Generation runs on a single background worker that handles one request at a time,
+    so the chat history is only ever touched by that thread.
     """
 
     def __init__(self, game: model.Game, engine: EngineWrapper, config) -> None:
         self.game = game
         self.engine = engine
-        self._pending_player_move: Optional[tuple] = None
+        self._pending_player_move: Optional[tuple[chess.Board, str]] = None
 
         ai_cfg = getattr(config, "ai_chat", None)
 
         def cfg(key, default):
-            return getattr(ai_cfg, key, default) if ai_cfg else default
+            # Configuration returns None for missing keys instead of raising AttributeError
+            value = getattr(ai_cfg, key, None) if ai_cfg else None
+            return default if value is None else value
 
         settings = LlamaCppChatSettings(
             enabled=cfg("enabled", False),
@@ -68,21 +105,36 @@ class AIChatHandler:
             model=cfg("model", None),
             timeout_seconds=cfg("timeout_seconds", 20),
             max_history_messages=cfg("max_history_messages", 10),
-            max_tokens=cfg("max_tokens", 80),
+            max_tokens=min(cfg("max_tokens", 45), _MAX_COMMENT_TOKENS),
             coaching_max_tokens=cfg("coaching_max_tokens", 350),
             temperature=cfg("temperature", 0.7),
+            parallel_slots=cfg("parallel_slots", 0),
         )
 
         self._enabled = settings.enabled
-        self._client = LlamaCppClient(settings)
         self._history = ChatHistory(settings.max_history_messages)
         self._coaching_max_tokens = settings.coaching_max_tokens
         self._latest_board: Optional[chess.Board] = None
         self._last_player_move_desc: Optional[str] = None
+        self._coaching_cache: Optional[tuple[tuple[str, int, Optional[str]], str]] = None
+        self._jobs: queue.Queue[Optional[_Job]] = queue.Queue(maxsize=_MAX_QUEUED_JOBS)
+        self._closed = False
 
+        # Every game builds a handler; only set up the HTTP session when the feature is on.
+        # All uses of the client are behind an ``_enabled`` check.
         if not self._enabled:
             return
 
+        # Only coaching questions are pinned, so move comments (a different system prompt) don't evict
+        # the cached coaching conversation. crc32 rather than hash() gives the same slot in every process.
+        self._coaching_slot = (
+            zlib.crc32(game.id.encode()) % settings.parallel_slots if settings.parallel_slots > 0 else None
+        )
+        self._client = LlamaCppClient(settings)
+        # System prompts stay byte-identical for the whole game so the server's prompt cache hits
+        self._coaching_prompt = build_coaching_instructions(game)
+        self._trash_talk_prompt = self._trash_talk_personality()
+        threading.Thread(target=self._run_jobs, daemon=True).start()
         self._client.probe()
         if self._client.connected:
             logger.info(
@@ -95,14 +147,20 @@ class AIChatHandler:
 
     # Public API
 
+    @property
+    def enabled(self) -> bool:
+        """Whether AI chat is turned on in the config."""
+        return self._enabled
+
     def get_ai_response(self, user_text: str, callback: Callable[[str], None]) -> None:
         """Reply to a player chat message asynchronously via callback."""
-        if not self._enabled:
+        if not self._enabled or self._closed:
             return
-        if not self._client.connected:
+        if not self._client.available:
             callback("My brain is currently disconnected (AI server offline).")
             return
-        threading.Thread(target=self._generate, args=(user_text, callback), daemon=True).start()
+        if not self._submit(self._generate, user_text, callback):
+            callback("Still thinking, ask me again in a moment.")
 
     def after_move(self, board: chess.Board, move_uci: str, mover_color: str,
                    send_message: Callable[[str], None]) -> None:
@@ -110,23 +168,29 @@ class AIChatHandler:
         Called after every move. When the bot just moved, score the quality of
         the opponent's previous move and optionally send a trash-talk or compliment.
         """
-        if not self._enabled or not self._client.connected:
+        if not self._enabled or self._closed:
             return
 
         bot_moved = (mover_color == str(self.game.my_color))
         if not bot_moved:
-            # Save the player's move so we can evaluate it once the bot replies
-            self._pending_player_move = (board.copy(), move_uci)
+            # Save the position before the player's move so we can describe it once the bot replies.
+            # Copying only the last move keeps this cheap however long the game is.
+            pre_move_board = board.copy(stack=1)
+            try:
+                pre_move_board.pop()
+            except IndexError:
+                pre_move_board = board.copy(stack=False)
+            self._pending_player_move = (pre_move_board, move_uci)
             return
 
-        # Bot just moved — keep the latest board for coaching context
-        self._latest_board = board.copy()
+        # Bot just moved — keep the latest board (with just the moves the coaching context describes)
+        self._latest_board = board.copy(stack=RECENT_MOVE_PLIES)
 
         # We now have a fresh engine evaluation to compare against the player's last move
         if len(self.engine.scores) < 2 or self._pending_player_move is None:
             return
 
-        player_board, player_uci = self._pending_player_move
+        pre_move_board, player_uci = self._pending_player_move
         self._pending_player_move = None
 
         try:
@@ -144,44 +208,100 @@ class AIChatHandler:
         if abs(delta) < 75:
             return  # Move was not notable enough to comment on
 
-        # player_board is the state AFTER the player moved; pop it to describe the piece used
-        pre_move_board = player_board.copy()
-        try:
-            pre_move_board.pop()
-        except Exception:
-            pre_move_board = player_board
+        if not self._client.available:
+            return
 
         move_desc = describe_move(pre_move_board, player_uci)
         self._last_player_move_desc = move_desc
         context = build_trash_talk_context(self.game, self.engine, board, move_desc, delta)
 
-        threading.Thread(target=self._generate_move_comment, args=(context, send_message), daemon=True).start()
+        if not self._submit(self._generate_move_comment, context, send_message):
+            logger.debug("AI chat is busy; skipping move comment")
+
+    def close(self) -> None:
+        """Stop the background worker once the game is over."""
+        if not self._enabled or self._closed:
+            return
+        self._closed = True
+        try:
+            self._jobs.put_nowait(None)
+        except queue.Full:
+            pass  # The worker checks ``_closed`` after each job
 
     # Internals
 
+    def _submit(self, func: Callable[..., None], *args: Any) -> bool:
+        """Queue a generation job for the worker. Returns False when the queue is full."""
+        try:
+            self._jobs.put_nowait((func, args))
+            return True
+        except queue.Full:
+            return False
+
+    def _run_jobs(self) -> None:
+        """Worker loop: run queued generation jobs one at a time until closed."""
+        while not self._closed:
+            job = self._jobs.get()
+            if job is None:
+                break
+            func, args = job
+            try:
+                func(*args)
+            except Exception:
+                # Keep the worker alive; it is the only thread answering chat for this game
+                logger.exception("AI chat job failed")
+
     def _trash_talk_personality(self) -> str:
-        """Build the personality block injected as the system prompt for move comments."""
-        move_num = len(self.engine.scores)
-        phase = game_phase(move_num)
+        """
+        Build the personality block injected as the system prompt for move comments.
+        The game phase is part of the move context, not this prompt, so it never changes during a game.
+        """
         return (
             f"You are {self.game.me.name}, a cocky, sharp-tongued chess bot on Lichess "
             f"playing as {self.game.my_color} against {self.game.opponent.name}. "
-            f"It is the {phase} (roughly move {move_num}). "
             "Personality: confident, a little arrogant when winning, darkly amused by mistakes — "
             "grandmaster trash talk, never outright insults. "
             "Rules: ONE punchy sentence, hard cap 140 characters, no hashtags, no analysis notation."
         )
 
+    def _coaching_context(self) -> str:
+        """
+        Return the coaching context for the current position.
+
+        The context only changes when a move is played, so it is rebuilt once per position
+        instead of on every chat message.
+        """
+        board = self._latest_board or chess.Board()
+        key = (board.fen(), len(self.engine.scores), self._last_player_move_desc)
+        if self._coaching_cache is None or self._coaching_cache[0] != key:
+            context = build_coaching_context(self.game, self.engine, board, self._last_player_move_desc)
+            self._coaching_cache = (key, context)
+        return self._coaching_cache[1]
+
     def _generate(self, user_text: str, callback: Callable[[str], None]) -> None:
-        """Generate a reply to a player chat message (runs in a background thread)."""
+        """Generate a reply to a player chat message (runs on the worker thread)."""
         try:
             self._history.add("user", user_text)
-            board = self._latest_board or chess.Board()
-            coaching_ctx = build_coaching_context(
-                self.game, self.engine, board, self._last_player_move_desc
-            )
-            messages = [{"role": "system", "content": coaching_ctx}] + self._history.messages
-            reply = self._client.chat(messages, max_tokens=self._coaching_max_tokens)
+            # The position goes in front of the newest message only, so everything before it is unchanged
+            history = self._history.messages
+            question = {"role": "user", "content": f"{self._coaching_context()}\n\nMy message: {user_text}"}
+            messages = [{"role": "system", "content": self._coaching_prompt}] + history[:-1] + [question]
+
+            # Send each chat-sized chunk as soon as it is complete instead of waiting for the whole reply
+            pieces: list[str] = []
+            pending = ""
+            for piece in self._client.stream_chat(messages, max_tokens=self._coaching_max_tokens,
+                                                  slot=self._coaching_slot):
+                pieces.append(piece)
+                complete, pending = _take_complete_chunks(pending + piece)
+                for chunk in complete:
+                    callback(chunk)
+            reply = "".join(pieces).strip()
+
+            if not reply:
+                # Server may not support streaming; retry once without it
+                reply = self._client.chat(messages, max_tokens=self._coaching_max_tokens, slot=self._coaching_slot)
+                pending = reply
 
             if not reply:
                 self._history.rollback_last_user()
@@ -190,7 +310,7 @@ class AIChatHandler:
 
             self._history.add("assistant", reply)
             logger.info("AI response: %s", reply)
-            for chunk in _split_for_chat(reply):
+            for chunk in _split_for_chat(pending):
                 callback(chunk)
 
         except Exception:
@@ -199,13 +319,13 @@ class AIChatHandler:
             callback("I'm having a brain-fart and can't reply.")
 
     def _generate_move_comment(self, context: str, send_message: Callable[[str], None]) -> None:
-        """Generate and send an unprompted comment after a notable move (background thread)."""
+        """Generate and send an unprompted comment after a notable move (runs on the worker thread)."""
         try:
             messages = [
-                {"role": "system", "content": self._trash_talk_personality()},
+                {"role": "system", "content": self._trash_talk_prompt},
                 {"role": "user", "content": context},
             ]
-            reply = self._client.chat(messages)
+            reply = self._client.chat(messages, stop=_COMMENT_STOP, frequency_penalty=_COMMENT_FREQUENCY_PENALTY)
             if reply:
                 send_message(reply)
         except Exception:
@@ -18,36 +18,28 @@ class ChatHistory:
         return list(self._messages)
 
     def add(self, role: str, content: str) -> None:
-        """Append a message and re-normalize the history."""
-        self._messages.append({"role": role, "content": content})
-        self._normalize()
+        """
+        Append a message while keeping the history valid.
+
+        A leading assistant message is dropped, consecutive messages from the same role are merged,
+        and the oldest user/assistant pair is removed once the history grows past max_messages.
+        """
+        if self.max_messages <= 0:
+            return
+        if not self._messages:
+            if role == "user":
+                self._messages.append({"role": role, "content": content})
+        elif self._messages[-1]["role"] == role:
+            merged = self._messages[-1]["content"] + "\n" + content
+            self._messages[-1] = {"role": role, "content": merged}
+        else:
+            self._messages.append({"role": role, "content": content})
+
+        # Removing whole pairs keeps the history starting with a user turn
+        while len(self._messages) > self.max_messages:
+            del self._messages[:2]
 
     def rollback_last_user(self) -> None:
         """Remove the last user message (used when the AI fails to reply)."""
         if self._messages and self._messages[-1].get("role") == "user":
             self._messages.pop()
-
-    def _normalize(self) -> None:
-        """Enforce strict alternation and trim to max_messages."""
-        # History must start with a user turn
-        while self._messages and self._messages[0]["role"] != "user":
-            self._messages.pop(0)
-
-        # Keep only messages that follow the correct user -> assistant -> user -> ... pattern
-        normalized, expected = [], "user"
-        for msg in self._messages:
-            if msg["role"] == expected:
-                normalized.append(msg)
-                expected = "assistant" if expected == "user" else "user"
-        self._messages = normalized
-
-        # Trim oldest messages if over the limit
-        if self.max_messages <= 0:
-            self._messages = []
-            return
-        if len(self._messages) > self.max_messages:
-            self._messages = self._messages[-self.max_messages:]
-
-        # After trimming, ensure we still start with a user turn
-        while self._messages and self._messages[0]["role"] != "user":
-            self._messages.pop(0)
@@ -9,6 +9,10 @@ _PIECE_NAMES = {
     chess.KING: "King",
 }
 
+_CASTLING_MOVES = frozenset(
+    chess.Move.from_uci(uci) for uci in ("e1g1", "e1c1", "e8g8", "e8c8")
+)
+
 
 def describe_move(board: chess.Board, move_uci: str) -> str:
     """
@@ -27,11 +31,7 @@ def describe_move(board: chess.Board, move_uci: str) -> str:
         return move_uci
 
     # Castling
-    castling_moves = {
-        chess.Move.from_uci("e1g1"), chess.Move.from_uci("e1c1"),
-        chess.Move.from_uci("e8g8"), chess.Move.from_uci("e8c8"),
-    }
-    if move in castling_moves:
+    if move in _CASTLING_MOVES:
         side = "King-side" if move.to_square in (chess.G1, chess.G8) else "Queen-side"
         return f"{side} castling"
 
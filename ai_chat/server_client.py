@@ -1,28 +1,75 @@
 import logging
+import time
+from collections.abc import Iterator
 from typing import Dict, List, Optional
 
+import orjson
 import requests
+from requests.adapters import HTTPAdapter
 
 from .settings import LlamaCppChatSettings
 
 logger = logging.getLogger(__name__)
 
+_JSON_HEADERS = {"Content-Type": "application/json"}
+
+# Longest time (seconds) requests are skipped after repeated failures before the server is probed again
+_MAX_COOLDOWN_SECONDS = 60
+
+# Endpoint paths that users commonly paste into ``url``. Ollama also serves the
+# OpenAI-compatible API under /v1, so every backend goes through /v1/chat/completions.
+_ENDPOINT_SUFFIXES = ("/v1/chat/completions", "/api/generate", "/api/chat", "/v1")
+
+
+def _normalize_base_url(url: str) -> str:
+    """Strip a trailing slash and any known endpoint path from the configured server URL."""
+    base = url.rstrip("/")
+    for suffix in _ENDPOINT_SUFFIXES:
+        if base.endswith(suffix):
+            return base[:-len(suffix)]
+    return base
+
+
+def _snippet(body: bytes) -> str:
+    """Decode the start of a response body for error logs."""
+    return body[:500].decode("utf-8", "replace")
+
 
 class LlamaCppClient:
-    """Handles all HTTP communication with the llama.cpp OpenAI-compatible server."""
+    """
+    Handles all HTTP communication with the llama.cpp OpenAI-compatible server.
+
+    Acts as a circuit breaker: after a failed request the server is left alone for a cooldown
+    that doubles with each consecutive failure (up to a minute), so a dead server does not hold
+    every chat message for the full request timeout. Once the cooldown ends, the next request
+    first re-probes the server.
+    """
 
     def __init__(self, settings: LlamaCppChatSettings) -> None:
         self.settings = settings
+        self._base = _normalize_base_url(settings.base_url)
+        # One keep-alive connection pool per client, reused by probes and chat requests alike
         self._session = requests.Session()
+        self._session.headers["Connection"] = "keep-alive"
+        adapter = HTTPAdapter(pool_connections=2, pool_maxsize=4, max_retries=1)
+        self._session.mount("http://", adapter)
+        self._session.mount("https://", adapter)
         self.connected = False
         self.model_id: Optional[str] = None
+        self._fail_count = 0
+        self._cooldown_until = 0.0
+
+    @property
+    def available(self) -> bool:
+        """Whether a request may be attempted now. Never blocks; re-probing happens in the request itself."""
+        return self.connected or time.monotonic() >= self._cooldown_until
 
     def probe(self) -> bool:
         """Check server connectivity and discover the available model ID."""
         try:
             r = self._session.get(self._url("/v1/models"), timeout=5)
             if r.status_code == 200:
-                models = r.json().get("data") or []
+                models = orjson.loads(r.content).get("data") or []
                 if models:
                     self.model_id = models[0].get("id")
                 self.connected = True
@@ -32,51 +79,153 @@ class LlamaCppClient:
 
         # Fall back to a plain GET on the root
         try:
-            self.connected = self._session.get(
-                self.settings.base_url.rstrip("/") + "/", timeout=5
+            reachable = self._session.get(
+                self._url("/"), timeout=5
             ).status_code in (200, 301, 302)
         except Exception:
-            self.connected = False
+            reachable = False
 
+        # A reachable server may still fail chat requests, so only a successful chat resets the backoff
+        if reachable:
+            self.connected = True
+        else:
+            self._record_failure()
         return self.connected
 
-    def chat(self, messages: List[Dict[str, str]], max_tokens: Optional[int] = None) -> str:
+    def chat(self, messages: List[Dict[str, str]], max_tokens: Optional[int] = None,
+             stop: Optional[List[str]] = None, frequency_penalty: Optional[float] = None,
+             slot: Optional[int] = None) -> str:
         """
         Send a chat completion request and return the assistant's reply.
         Returns an empty string on any failure.
 
         :param max_tokens: Override the default max_tokens from settings (e.g. for coaching replies).
+        :param stop: Strings at which the server stops generating.
+        :param frequency_penalty: Penalty for repeating tokens already in the reply.
+        :param slot: The server slot to run on, so its cached prompt is reused. ``None`` lets the server choose.
         """
-        payload = {
-            "model": self.model_id or self.settings.model or "gpt-3.5-turbo",
-            "messages": messages,
-            "temperature": float(self.settings.temperature),
-            "max_tokens": int(max_tokens if max_tokens is not None else self.settings.max_tokens),
-            "stream": False,
-        }
+        if not self._ready():
+            return ""
+        payload = self._payload(messages, max_tokens, stream=False, slot=slot)
+        if stop is not None:
+            payload["stop"] = stop
+        if frequency_penalty is not None:
+            payload["frequency_penalty"] = frequency_penalty
         try:
             r = self._session.post(
                 self._url("/v1/chat/completions"),
-                json=payload,
+                data=orjson.dumps(payload),
+                headers=_JSON_HEADERS,
+                stream=False,
                 timeout=self.settings.timeout_seconds,
             )
         except requests.RequestException as e:
             logger.error("llama.cpp request failed: %s", e)
-            self.connected = False
+            self._record_failure()
             return ""
 
+        # Read the body once; requests would otherwise sniff the encoding again for .text
+        body = r.content
         if r.status_code != 200:
-            logger.error("llama.cpp API error (%s): %s", r.status_code, r.text[:500])
-            if r.status_code in (502, 503, 504):
-                self.connected = False
+            logger.error("llama.cpp API error (%s): %s", r.status_code, _snippet(body))
+            if r.status_code >= 500:
+                self._record_failure()
             return ""
 
+        self._record_success()
         try:
-            choices = r.json().get("choices", [])
+            choices = orjson.loads(body).get("choices", [])
             return (choices[0].get("message", {}).get("content") or "").strip() if choices else ""
         except Exception:
-            logger.error("Unexpected llama.cpp response: %s", r.text[:500])
+            logger.error("Unexpected llama.cpp response: %s", _snippet(body))
             return ""
 
+    def stream_chat(self, messages: List[Dict[str, str]], max_tokens: Optional[int] = None,
+                    slot: Optional[int] = None) -> Iterator[str]:
+        """
+        Stream a chat completion and yield the reply text piece by piece as the server generates it.
+        Yields nothing on any failure, so callers can fall back to :meth:`chat`.
+
+        :param max_tokens: Override the default max_tokens from settings (e.g. for coaching replies).
+        :param slot: The server slot to run on, so its cached prompt is reused. ``None`` lets the server choose.
+        """
+        if not self._ready():
+            return
+        payload = self._payload(messages, max_tokens, stream=True, slot=slot)
+        try:
+            r = self._session.post(
+                self._url("/v1/chat/completions"),
+                data=orjson.dumps(payload),
+                headers=_JSON_HEADERS,
+                stream=True,
+                timeout=self.settings.timeout_seconds,
+            )
+        except requests.RequestException as e:
+            logger.error("llama.cpp streaming request failed: %s", e)
+            self._record_failure()
+            return
+
+        with r:
+            if r.status_code != 200:
+                # Only read the start of the error body instead of downloading and decoding all of it
+                logger.error("llama.cpp streaming API error (%s): %s", r.status_code,
+                             _snippet(r.raw.read(500, decode_content=True)))
+                if r.status_code >= 500:
+                    self._record_failure()
+                return
+
+            self._record_success()
+
+            try:
+                for line in r.iter_lines():
+                    # Server-sent events: "data: {...}" lines, terminated by "data: [DONE]"
+                    if not line.startswith(b"data:"):
+                        continue
+                    data = line[len(b"data:"):].strip()
+                    if data == b"[DONE]":
+                        break
+                    choices = orjson.loads(data).get("choices") or []
+                    content = (choices[0].get("delta") or {}).get("content") if choices else None
+                    if content:
+                        yield content
+            except requests.RequestException as e:
+                logger.error("llama.cpp stream interrupted: %s", e)
+                self._record_failure()
+            except ValueError as e:
+                logger.error("Unexpected llama.cpp stream data: %s", e)
+
+    def _ready(self) -> bool:
+        """Skip requests during the cooldown; once it has passed, re-probe the server before trying again."""
+        if self.connected:
+            return True
+        if time.monotonic() < self._cooldown_until:
+            return False
+        return self.probe()
+
+    def _record_success(self) -> None:
+        self.connected = True
+        self._fail_count = 0
+        self._cooldown_until = 0.0
+
+    def _record_failure(self) -> None:
+        self.connected = False
+        self._fail_count += 1
+        self._cooldown_until = time.monotonic() + min(_MAX_COOLDOWN_SECONDS, 2 ** self._fail_count)
+
+    def _payload(self, messages: List[Dict[str, str]], max_tokens: Optional[int], stream: bool,
+                 slot: Optional[int] = None) -> Dict[str, object]:
+        payload: Dict[str, object] = {
+            "model": self.model_id or self.settings.model or "gpt-3.5-turbo",
+            "messages": messages,
+            "temperature": float(self.settings.temperature),
+            "max_tokens": int(max_tokens if max_tokens is not None else self.settings.max_tokens),
+            "stream": stream,
+            # llama.cpp extension: only the part of the prompt that changed since the last turn is re-evaluated
+            "cache_prompt": True,
+        }
+        if slot is not None:
+            payload["id_slot"] = slot
+        return payload
+
     def _url(self, path: str) -> str:
-        return self.settings.base_url.rstrip("/") + path
+        return self._base + path
@@ -8,13 +8,18 @@ class LlamaCppChatSettings:
     Configuration for the llama.cpp AI chat feature.
 
     All values are read from the ``ai_chat`` section of config.yml:
-        enabled, url, model, timeout_seconds, max_history_messages, max_tokens, temperature
+        enabled, url, model, timeout_seconds, max_history_messages, max_tokens, temperature, parallel_slots
+
+    ``parallel_slots`` is the ``--parallel`` value the server was started with. When set, each game's
+    coaching questions are pinned to one slot so the server can reuse its cached prompt between turns.
+    0 leaves slot selection to the server.
     """
     enabled: bool = True
     base_url: str = "http://localhost:8080"
     model: Optional[str] = None
     timeout_seconds: int = 20
     max_history_messages: int = 10
-    max_tokens: int = 80
+    max_tokens: int = 45
     coaching_max_tokens: int = 350
     temperature: float = 0.7
+    parallel_slots: int = 0
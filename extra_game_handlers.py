@@ -4,6 +4,8 @@ from lib.lichess_types import OPTIONS_TYPE
 import chess
 import logging
 
+logger = logging.getLogger(__name__)
+
 
 def game_specific_options(game: model.Game) -> OPTIONS_TYPE:  # noqa: ARG001
     """
@@ -39,14 +41,7 @@ def after_move(
     :param mover_color: "white" or "black" indicating who made the move.
     :param conversation: The Conversation instance used to send chat messages (optional).
     """
-    logger = logging.getLogger(__name__)
-    logger.info(
-        "after_move called: game=%r board=%r move_uci=%s mover_color=%s",
-        game,
-        board,
-        move_uci,
-        mover_color,
-    )
+    logger.debug("after_move called: game=%s move_uci=%s mover_color=%s", game.id, move_uci, mover_color)
 
     if conversation is not None:
         ai = conversation.ai_chat
@@ -262,6 +262,7 @@ def insert_default_values(CONFIG: CONFIG_DICT_TYPE) -> None:
     set_config_default(CONFIG, "ai_chat", key="enabled", default=False)
     set_config_default(CONFIG, "ai_chat", key="model", default="llama3.2:1b")
     set_config_default(CONFIG, "ai_chat", key="url", default="http://localhost:11434/api/generate")
+    set_config_default(CONFIG, "ai_chat", key="parallel_slots", default=0)
 
 
 def process_block_list(CONFIG: CONFIG_DICT_TYPE) -> None:
@@ -1,5 +1,6 @@
 """Allows lichess-bot to send messages to the chat."""
 import logging
+import re
 from collections.abc import Sequence
 from typing import TypeAlias
 
@@ -17,6 +18,30 @@ logger = logging.getLogger(__name__)
 
 MAX_LICHESS_CHAT_CHARS = 140
 
+# Common chat lines that are answered directly instead of asking the AI
+_CANNED_REPLIES = {
+    "hi": "Hi, good luck!",
+    "hello": "Hello, good luck!",
+    "hey": "Hey, good luck!",
+    "gl": "Thanks, you too!",
+    "glhf": "Thanks, you too!",
+    "good luck": "Thanks, you too!",
+    "have fun": "Thanks, you too!",
+}
+_GG_RE = re.compile(r"^(gg|good game|wp|well played)[!. ]*$", re.IGNORECASE)
+_THANKS_RE = re.compile(r"^(ty|thx|thanks|thank you)[!. ]*$", re.IGNORECASE)
+_WS_RE = re.compile(r"\s+")
+
+
+def _canned_reply(text: str) -> str | None:
+    """Return a ready-made reply for greetings, thanks and "gg", or None when the AI should answer."""
+    text = text.strip()
+    if _GG_RE.match(text):
+        return "gg, thanks for the game!"
+    if _THANKS_RE.match(text):
+        return "You're welcome!"
+    return _CANNED_REPLIES.get(text.lower().rstrip("!. "))
+
 
 def _lichess_safe_message(text: str, limit: int = MAX_LICHESS_CHAT_CHARS) -> str:
     """
@@ -29,7 +54,7 @@ def _lichess_safe_message(text: str, limit: int = MAX_LICHESS_CHAT_CHARS) -> str
     if not text:
         return ""
 
-    clean = " ".join(str(text).split())
+    clean = _WS_RE.sub(" ", str(text)).strip()
     if len(clean) <= limit:
         return clean
 
@@ -98,6 +123,8 @@ class Conversation:
 
         if line.text and line.text.startswith(self.command_prefix):
             self.command(line, line.text[1:].lower())
+        elif line.text and self.ai_chat.enabled and (canned := _canned_reply(line.text)):
+            self.send_reply(line, canned)
         elif line.text:
             # Gebruik de AI handler voor gewone berichten
             self.ai_chat.get_ai_response(line.text, lambda reply: self.send_reply(line, reply))
@@ -683,10 +683,12 @@ def play_game(li: lichess.Lichess,
         abort_time = seconds(config.abort_time)
         game = model.Game(initial_state, user_profile["username"], li.baseUrl, abort_time)
 
-        with engine_wrapper.create_engine(config, game) as engine:
+        with engine_wrapper.create_engine(config, game) as engine, contextlib.ExitStack() as game_cleanup:
             engine.get_opponent_info(game)
             logger.debug(f"The engine for game {game_id} has pid={engine.get_pid()}")
             conversation = Conversation(game, engine, config, li, __version__, challenge_queue)
+            # Stop the AI chat worker however the game loop ends; pool processes are reused for later games
+            game_cleanup.callback(conversation.ai_chat.close)
 
             logger.info(f"+++ {game}")
 
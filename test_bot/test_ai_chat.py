@@ -0,0 +1,197 @@
+"""Tests for the AI chat package."""
+from unittest.mock import Mock, patch
+
+import orjson
+import requests
+
+from ai_chat import AIChatHandler
+from ai_chat.handler import _split_for_chat, _take_complete_chunks
+from ai_chat.history import ChatHistory
+from ai_chat.server_client import LlamaCppClient
+from ai_chat.settings import LlamaCppChatSettings
+from lib.config import Configuration
+
+
+def test_history_starts_with_user() -> None:
+    """Test that an assistant message cannot start the history."""
+    history = ChatHistory(10)
+    history.add("assistant", "Hello")
+    assert history.messages == []
+
+    history.add("user", "Hi")
+    history.add("assistant", "Good luck")
+    assert [m["role"] for m in history.messages] == ["user", "assistant"]
+
+
+def test_history_merges_consecutive_roles() -> None:
+    """Test that consecutive messages from the same role are merged into one."""
+    history = ChatHistory(10)
+    history.add("user", "Hi")
+    history.add("user", "Are you there?")
+    assert history.messages == [{"role": "user", "content": "Hi\nAre you there?"}]
+
+
+def test_history_trims_oldest_pair() -> None:
+    """Test that the oldest user/assistant pair is dropped when the history is full."""
+    history = ChatHistory(3)
+    for i in range(3):
+        history.add("user", f"question {i}")
+        history.add("assistant", f"answer {i}")
+    assert history.messages == [{"role": "user", "content": "question 2"},
+                                {"role": "assistant", "content": "answer 2"}]
+
+    history.add("user", "question 3")
+    assert [m["content"] for m in history.messages] == ["question 2", "answer 2", "question 3"]
+
+    empty_history = ChatHistory(0)
+    empty_history.add("user", "Hi")
+    assert empty_history.messages == []
+
+
+def test_history_rollback() -> None:
+    """Test that an unanswered user message can be rolled back."""
+    history = ChatHistory(10)
+    history.add("user", "Hi")
+    history.add("assistant", "Hello")
+    history.add("user", "What is the best move?")
+    history.rollback_last_user()
+    assert [m["role"] for m in history.messages] == ["user", "assistant"]
+
+
+def test_split_for_chat() -> None:
+    """Test that long replies are split into chat-sized chunks at sentence boundaries."""
+    assert _split_for_chat("Nice move. I saw it coming.") == ["Nice move. I saw it coming."]
+
+    sentences = ["This is a fairly long sentence about the position on the board." for _ in range(4)]
+    chunks = _split_for_chat(" ".join(sentences))
+    assert chunks == [" ".join(sentences[:2]), " ".join(sentences[2:])]
+
+    chunks = _split_for_chat("Short. " + "b" * 300 + ". End.")
+    assert [len(chunk) for chunk in chunks] == [6, 140, 140, 26]
+    assert all(len(chunk) <= 140 for chunk in chunks)
+
+
+def test_client_cooldown_after_failure() -> None:
+    """Test that the client stops sending requests to a failing server until the cooldown has passed."""
+    client = LlamaCppClient(LlamaCppChatSettings(base_url="http://localhost:8080"))
+    client.connected = True
+    messages = [{"role": "user", "content": "Hi"}]
+    now = [100.0]
+    probe_response = Mock(status_code=200, content=b'{"data": [{"id": "model"}]}')
+    error_response = Mock(status_code=500, content=b"Internal Server Error")
+    reply_response = Mock(status_code=200, content=b'{"choices": [{"message": {"content": "Hello"}}]}')
+
+    def cooldown_ends_after(seconds: float) -> bool:
+        """Check that the client is unavailable just before ``seconds`` have passed and available after."""
+        start = now[0]
+        now[0] = start + seconds - 0.1
+        unavailable = not client.available
+        now[0] = start + seconds
+        return unavailable and client.available
+
+    with patch("ai_chat.server_client.time.monotonic", side_effect=lambda: now[0]), \
+         patch("requests.Session.get", return_value=probe_response) as get:
+        with patch("requests.Session.post", side_effect=requests.ConnectionError) as post:
+            assert client.chat(messages) == ""
+            assert post.call_count == 1
+            assert not client.connected
+
+            # During the cooldown no request is made at all
+            assert client.chat(messages) == ""
+            assert list(client.stream_chat(messages)) == []
+            assert post.call_count == 1
+            assert cooldown_ends_after(2)
+
+        # A server that answers the probe but fails chat requests keeps backing off for longer
+        with patch("requests.Session.post", return_value=error_response):
+            assert client.chat(messages) == ""
+            assert cooldown_ends_after(4)
+            assert client.chat(messages) == ""
+            assert cooldown_ends_after(8)
+        assert get.call_count == 2
+
+        # Once the cooldown has passed, the server is probed again before chatting
+        with patch("requests.Session.post", return_value=reply_response):
+            assert client.chat(messages) == "Hello"
+        assert get.call_count == 3
+        assert client.connected
+        assert client.model_id == "model"
+
+        # A successful chat resets the backoff
+        with patch("requests.Session.post", side_effect=requests.ConnectionError):
+            assert client.chat(messages) == ""
+            assert cooldown_ends_after(2)
+
+
+def test_take_complete_chunks() -> None:
+    """Test that streamed pieces are sent in chat-sized chunks without losing whitespace between pieces."""
+    def stream(pieces: list[str]) -> list[str]:
+        sent: list[str] = []
+        pending = ""
+        for piece in pieces:
+            complete, pending = _take_complete_chunks(pending + piece)
+            sent.extend(complete)
+        return sent + _split_for_chat(pending)
+
+    assert stream(["Nice", " move.\n", "You", " are", " losing"]) == ["Nice move. You are losing"]
+
+    sentences = ["This is a fairly long sentence about the position on the board." for _ in range(4)]
+    text = " ".join(sentences)
+    assert stream([text[i:i + 7] for i in range(0, len(text), 7)]) == _split_for_chat(text)
+
+    long_word = "b" * 300
+    assert stream([long_word[i:i + 9] for i in range(0, 300, 9)]) == _split_for_chat(long_word)
+
+
+def test_client_stop_only_when_requested() -> None:
+    """Test that stop sequences and the repetition penalty are only sent when the caller asks for them."""
+    client = LlamaCppClient(LlamaCppChatSettings(base_url="http://localhost:8080"))
+    client.connected = True
+    messages = [{"role": "user", "content": "Hi"}]
+    reply_response = Mock(status_code=200, content=b'{"choices": [{"message": {"content": "Hello"}}]}')
+
+    with patch("requests.Session.post", return_value=reply_response) as post:
+        client.chat(messages)
+        payload = orjson.loads(post.call_args.kwargs["data"])
+        assert "stop" not in payload
+        assert "frequency_penalty" not in payload
+
+        client.chat(messages, stop=["\n\n"], frequency_penalty=0.3)
+        payload = orjson.loads(post.call_args.kwargs["data"])
+        assert payload["stop"] == ["\n\n"]
+        assert payload["frequency_penalty"] == 0.3
+
+
+def test_handler_with_minimal_config() -> None:
+    """Test that the handler falls back to defaults for ai_chat keys missing from the config."""
+    config = Configuration({"ai_chat": {"enabled": False, "model": "llama3.2:1b", "url": "http://localhost:8080"}})
+    handler = AIChatHandler(Mock(), Mock(), config)
+    assert not handler.enabled
+
+    replies: list[str] = []
+    handler.get_ai_response("Hi", replies.append)
+    assert replies == []
+
+
+def test_handler_enabled_without_parallel_slots() -> None:
+    """Test that an enabled handler starts from a config written before parallel_slots existed."""
+    config = Configuration({"ai_chat": {"enabled": True, "model": "llama3.2:1b", "url": "http://localhost:8080"}})
+    with patch("ai_chat.server_client.LlamaCppClient.probe", return_value=False):
+        handler = AIChatHandler(Mock(id="zzzzzzzz"), Mock(), config)
+    assert handler.enabled
+    handler.close()
+
+
+def test_client_slot_only_when_requested() -> None:
+    """Test that a request is only pinned to a server slot when the caller asks for one."""
+    client = LlamaCppClient(LlamaCppChatSettings(base_url="http://localhost:8080"))
+    client.connected = True
+    messages = [{"role": "user", "content": "Hi"}]
+    reply_response = Mock(status_code=200, content=b'{"choices": [{"message": {"content": "Hello"}}]}')
+
+    with patch("requests.Session.post", return_value=reply_response) as post:
+        client.chat(messages)
+        assert "id_slot" not in orjson.loads(post.call_args.kwargs["data"])
+
+        client.chat(messages, slot=2)
+        assert orjson.loads(post.call_args.kwargs["data"])["id_slot"] == 2
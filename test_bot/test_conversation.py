@@ -0,0 +1,24 @@
+"""Tests for the chat helpers in the conversation module."""
+from lib.conversation import _canned_reply, _lichess_safe_message
+
+
+def test_canned_reply() -> None:
+    """Test that common chat lines get a ready-made reply and everything else goes to the AI."""
+    assert _canned_reply("gg") == "gg, thanks for the game!"
+    assert _canned_reply("Good game!") == "gg, thanks for the game!"
+    assert _canned_reply("thx.") == "You're welcome!"
+    assert _canned_reply(" Hello! ") == "Hello, good luck!"
+    assert _canned_reply("glhf") == "Thanks, you too!"
+    assert _canned_reply("gg, why did you play Nf3?") is None
+    assert _canned_reply("hi, what opening is this?") is None
+
+
+def test_lichess_safe_message() -> None:
+    """Test that chat messages are collapsed onto one line and cut to the Lichess limit."""
+    assert _lichess_safe_message("  Nice\n\nmove,\tfriend.  ") == "Nice move, friend."
+    assert _lichess_safe_message("") == ""
+
+    long_text = "word " * 50
+    safe = _lichess_safe_message(long_text)
+    assert len(safe) <= 140
+    assert safe.endswith("word…")